@@ -4,6 +4,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 
 db = SQLAlchemy()
@@ -16,10 +17,18 @@ def create_app():
     # Load configuration
     app.config.from_object('app.config.Config')
     
+    # Trust X-Forwarded-For from the reverse proxy so rate limits key on the real client IP
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    
+    # Reject revoked tokens
+    from app.utils.revocation import is_token_revoked
+    jwt.token_in_blocklist_loader(is_token_revoked)
     CORS(app)
     
     # Register blueprints
@@ -30,6 +39,10 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(files_bp, url_prefix='/files')
     app.register_blueprint(sharing_bp, url_prefix='/sharing')
+
+    # CLI commands
+    from app.utils.search_utils import backfill_search_command
+    app.cli.add_command(backfill_search_command)
     
     # Create upload directory
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -13,14 +13,75 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Token revocation (Redis blocklist mirrored into a per-worker bloom filter)
+    REVOCATION_SYNC_INTERVAL = 2  # Seconds a revoked token may still be accepted by other workers
+    REVOCATION_SYNC_OVERLAP = 5
+    REVOCATION_REBUILD_INTERVAL = 3600
+    REVOCATION_BLOOM_CAPACITY = 100000
+    REVOCATION_BLOOM_ERROR_RATE = 0.001
+    
     # File Upload
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx', 'zip', 'rar'}
     
+    # Compression at rest (zstd)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 3))
+    COMPRESSION_SAMPLE_SIZE = 64 * 1024  # Bytes sampled for the compressibility test
+    COMPRESSION_MIN_RATIO = 0.9  # Only keep compressed copy if sample shrinks below this ratio
+    COMPRESSIBLE_CONTENT_TYPES = {
+        'text/plain',
+        'text/csv',
+        'application/pdf',
+        'application/msword',
+        'application/vnd.ms-excel',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+    
+    # Search
+    SEARCH_EXTRACTION_ENABLED = os.environ.get('SEARCH_EXTRACTION_ENABLED', 'true').lower() == 'true'
+    SEARCH_EXTRACTION_WORKERS = int(os.environ.get('SEARCH_EXTRACTION_WORKERS', 2))
+    SEARCH_EXTRACTION_MAX_CHARS = 500000  # Keep tsvector input well under Postgres' 1MB limit
+    SEARCH_EXTRACTABLE_EXTENSIONS = {'txt', 'pdf', 'docx'}
+    SEARCH_DEFAULT_LIMIT = 50
+    SEARCH_MAX_LIMIT = 200
+    
+    # Thumbnails (content-hash keyed cache inside UPLOAD_FOLDER, LRU-evicted by total size)
+    THUMBNAILS_ENABLED = os.environ.get('THUMBNAILS_ENABLED', 'true').lower() == 'true'
+    THUMBNAIL_SUBFOLDER = '.thumbnails'
+    THUMBNAIL_SIZES = {'small': 128, 'medium': 256, 'large': 512}
+    THUMBNAIL_QUALITY = 80
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', 1024 * 1024 * 1024))  # 1GB
+    THUMBNAIL_CACHE_LOW_WATERMARK = 0.9  # Evict down to this fraction of the max
+    THUMBNAIL_CACHE_RESCAN_SECONDS = 3600  # Re-seed the shared size counter from disk to correct drift
+    THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+    
+    # Rate limiting (token buckets as (capacity, refill tokens per second)).
+    # '<scope>' is per user, or per IP for anonymous callers; the optional '<scope>_ip'
+    # is a shared per-IP ceiling for authenticated traffic, sized for many users per NAT.
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMITS = {
+        'login': (10, 10 / 60),
+        'upload': (20, 1),
+        'upload_ip': (200, 10),
+        'download': (60, 2),
+        'download_ip': (600, 20)
+    }
+    MAX_CONCURRENT_TRANSFERS = int(os.environ.get('MAX_CONCURRENT_TRANSFERS', 4))
+    TRANSFER_SLOT_TTL = 3600  # Reclaims slots leaked by crashed workers
+    TRANSFER_RETRY_AFTER = 5
+    
+    # Number of trusted reverse proxies in front of the app (nginx in docker-compose)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    
     # Security
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
     BCRYPT_LOG_ROUNDS = 12
     
     # Redis (for caching and sessions)
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    REDIS_SOCKET_TIMEOUT = 0.2  # Keep request latency bounded when Redis is slow
+    REDIS_RETRY_SECONDS = 30  # Back-off before retrying Redis after a failure
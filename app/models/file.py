@@ -1,6 +1,7 @@
 # app/models/file.py
 from app import db
 from datetime import datetime
+from sqlalchemy import DDL, event
 import os
 
 class File(db.Model):
@@ -14,10 +15,30 @@ class File(db.Model):
     content_type = db.Column(db.String(100), nullable=False)
     file_hash = db.Column(db.String(64), nullable=False)  # SHA-256 hash
     is_encrypted = db.Column(db.Boolean, default=False)
+    compression = db.Column(db.String(20), nullable=True)  # None or 'zstd'
+    stored_size = db.Column(db.Integer, nullable=True)  # Size on disk after compression
+    content_text = db.deferred(db.Column(db.Text, nullable=True))  # Extracted for full-text search
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Search indexes (trigram filename match, full-text content match, keyset ordering).
+    # The first two only exist on Postgres, so create_all() still works on SQLite.
+    __table_args__ = (
+        db.Index(
+            'idx_files_original_filename_trgm',
+            'original_filename',
+            postgresql_using='gin',
+            postgresql_ops={'original_filename': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'idx_files_content_tsv',
+            db.text("to_tsvector('simple', coalesce(content_text, ''))"),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        db.Index('idx_files_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     shares = db.relationship('FileShare', backref='file', lazy=True, cascade='all, delete-orphan')
     
@@ -28,6 +49,7 @@ class File(db.Model):
             'original_filename': self.original_filename,
             'file_size': self.file_size,
             'content_type': self.content_type,
+            'compression': self.compression,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -37,6 +59,13 @@ class File(db.Model):
         if os.path.exists(self.file_path):
             os.remove(self.file_path)
 
+# gin_trgm_ops needs pg_trgm, so db.create_all() installs it before creating the table
+event.listen(
+    File.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
 class FileShare(db.Model):
     __tablename__ = 'file_shares'
     
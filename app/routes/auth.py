@@ -1,9 +1,14 @@
 # app/routes/auth.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+import redis
 from app import db
 from app.models.user import User
 from app.utils.validators import validate_email, validate_password, validate_json
+from app.utils.rate_limit import rate_limit
+from app.utils.revocation import revoke_token, revoke_user_tokens
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -44,6 +49,7 @@ def register():
     }), 201
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login')
 @validate_json('username', 'password')
 def login():
     data = request.get_json()
@@ -60,8 +66,8 @@ def login():
     if not user.is_active:
         return jsonify({'message': 'Account is deactivated'}), 401
     
-    # Create tokens
-    access_token = create_access_token(identity=user.id)
+    # Create tokens (is_active lets auth decorators skip the user lookup)
+    access_token = create_access_token(identity=user.id, additional_claims={'is_active': user.is_active})
     refresh_token = create_refresh_token(identity=user.id)
     
     return jsonify({
@@ -80,12 +86,53 @@ def refresh():
     if not user or not user.is_active:
         return jsonify({'message': 'Invalid user'}), 401
     
-    access_token = create_access_token(identity=current_user_id)
+    access_token = create_access_token(identity=current_user_id, additional_claims={'is_active': user.is_active})
     
     return jsonify({
         'access_token': access_token
     }), 200
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+@validate_json('refresh_token')
+def logout():
+    # Revoke the access token and its refresh token together, so neither outlives the session
+    try:
+        refresh_payload = decode_token(request.get_json()['refresh_token'], allow_expired=True)
+    except (JWTExtendedException, PyJWTError):
+        return jsonify({'message': 'Invalid refresh token'}), 400
+    
+    if refresh_payload.get('type') != 'refresh' or str(refresh_payload['sub']) != str(get_jwt_identity()):
+        return jsonify({'message': 'Invalid refresh token'}), 400
+    
+    try:
+        revoke_token(get_jwt())
+        revoke_token(refresh_payload)
+    except redis.RedisError:
+        return jsonify({'message': 'Logout could not be completed, try again'}), 503
+    
+    return jsonify({'message': 'Logout successful'}), 200
+
+@auth_bp.route('/deactivate', methods=['POST'])
+@jwt_required()
+def deactivate():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    user.is_active = False
+    db.session.commit()
+    
+    # Revoke all outstanding tokens (refresh checks is_active, but access tokens don't)
+    try:
+        revoke_user_tokens(user.id)
+    except redis.RedisError:
+        return jsonify({'message': 'Account deactivated, but existing sessions may remain valid until they expire'}), 503
+    
+    return jsonify({'message': 'Account deactivated successfully'}), 200
+
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def profile():
@@ -2,16 +2,27 @@
 from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
+from sqlalchemy import and_, or_, func
+from datetime import datetime
 import os
 from app import db
-from app.models.file import File
+from app.models.file import File, FileShare
 from app.models.user import User
-from app.utils.file_utils import allowed_file, generate_unique_filename, calculate_file_hash
+from app.utils.file_utils import (
+    allowed_file, generate_unique_filename, calculate_file_hash,
+    should_compress, compress_file, send_stored_file
+)
+from app.utils.rate_limit import rate_limit
+from app.utils.search_utils import (
+    schedule_text_extraction, escape_like, encode_cursor, decode_cursor, content_search_vector
+)
+from app.utils.thumbnail_utils import schedule_thumbnails, can_preview, send_thumbnail
 
 files_bp = Blueprint('files', __name__)
 
 @files_bp.route('/upload', methods=['POST'])
 @jwt_required()
+@rate_limit('upload', concurrent=True)
 def upload_file():
     current_user_id = get_jwt_identity()
     
@@ -50,20 +61,35 @@ def upload_file():
                 'file': existing_file.to_dict()
             }), 409
         
+        # Compress compressible file types at rest
+        file_size = os.path.getsize(file_path)
+        compression = None
+        stored_size = file_size
+        
+        if should_compress(file_path, file.content_type):
+            compression = 'zstd'
+            stored_size = compress_file(file_path)
+        
         # Create file record
         file_record = File(
             filename=unique_filename,
             original_filename=file.filename,
             file_path=file_path,
-            file_size=os.path.getsize(file_path),
+            file_size=file_size,
             content_type=file.content_type,
             file_hash=file_hash,
+            compression=compression,
+            stored_size=stored_size,
             user_id=current_user_id
         )
         
         db.session.add(file_record)
         db.session.commit()
         
+        # Index file contents and render previews in the background
+        schedule_text_extraction(file_record)
+        schedule_thumbnails(file_record)
+        
         return jsonify({
             'message': 'File uploaded successfully',
             'file': file_record.to_dict()
@@ -96,6 +122,104 @@ def list_files():
         }
     }), 200
 
+@files_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_files():
+    current_user_id = get_jwt_identity()
+    config = current_app.config
+    
+    query_text = request.args.get('q', '').strip()
+    scope = request.args.get('scope', 'all')
+    limit = min(
+        request.args.get('limit', config['SEARCH_DEFAULT_LIMIT'], type=int),
+        config['SEARCH_MAX_LIMIT']
+    )
+    
+    if scope not in ('all', 'owned', 'shared'):
+        return jsonify({'message': 'Scope must be one of: all, owned, shared'}), 400
+    
+    if limit < 1:
+        return jsonify({'message': 'Limit must be positive'}), 400
+    
+    # Files shared with the current user that have not expired
+    shared_file_ids = db.session.query(FileShare.file_id).filter(
+        FileShare.shared_with_user_id == current_user_id,
+        FileShare.expires_at > datetime.utcnow()
+    )
+    
+    if scope == 'owned':
+        query = File.query.filter(File.user_id == current_user_id)
+    elif scope == 'shared':
+        query = File.query.filter(File.id.in_(shared_file_ids))
+    else:
+        query = File.query.filter(or_(
+            File.user_id == current_user_id,
+            File.id.in_(shared_file_ids)
+        ))
+    
+    # Filename (trigram) and content (tsvector) match
+    if query_text:
+        content_query = func.plainto_tsquery(db.literal_column("'simple'::regconfig"), query_text)
+        query = query.filter(or_(
+            File.original_filename.ilike(f'%{escape_like(query_text)}%', escape='\\'),
+            content_search_vector().op('@@')(content_query)
+        ))
+    
+    # Metadata filters
+    content_type = request.args.get('content_type')
+    if content_type:
+        query = query.filter(File.content_type.ilike(f'{escape_like(content_type)}%', escape='\\'))
+    
+    min_size = request.args.get('min_size', type=int)
+    if min_size is not None:
+        query = query.filter(File.file_size >= min_size)
+    
+    max_size = request.args.get('max_size', type=int)
+    if max_size is not None:
+        query = query.filter(File.file_size <= max_size)
+    
+    try:
+        created_after = request.args.get('created_after')
+        if created_after:
+            query = query.filter(File.created_at >= datetime.fromisoformat(created_after))
+        
+        created_before = request.args.get('created_before')
+        if created_before:
+            query = query.filter(File.created_at < datetime.fromisoformat(created_before))
+    except ValueError:
+        return jsonify({'message': 'Dates must be in ISO 8601 format'}), 400
+    
+    # Keyset pagination on (created_at, id), newest first
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        
+        cursor_created_at, cursor_id = position
+        query = query.filter(or_(
+            File.created_at < cursor_created_at,
+            and_(File.created_at == cursor_created_at, File.id < cursor_id)
+        ))
+    
+    files = query.order_by(File.created_at.desc(), File.id.desc()).limit(limit + 1).all()
+    has_more = len(files) > limit
+    files = files[:limit]
+    
+    results = []
+    for file in files:
+        file_dict = file.to_dict()
+        file_dict['is_owner'] = str(file.user_id) == str(current_user_id)
+        results.append(file_dict)
+    
+    return jsonify({
+        'files': results,
+        'pagination': {
+            'limit': limit,
+            'next_cursor': encode_cursor(files[-1]) if has_more else None
+        }
+    }), 200
+
 @files_bp.route('/<int:file_id>', methods=['GET'])
 @jwt_required()
 def get_file(file_id):
@@ -115,6 +239,7 @@ def get_file(file_id):
 
 @files_bp.route('/<int:file_id>/download', methods=['GET'])
 @jwt_required()
+@rate_limit('download', concurrent=True)
 def download_file(file_id):
     current_user_id = get_jwt_identity()
     
@@ -129,11 +254,55 @@ def download_file(file_id):
     if not os.path.exists(file_record.file_path):
         return jsonify({'message': 'File not found on disk'}), 404
     
-    return send_file(
-        file_record.file_path,
-        as_attachment=True,
-        download_name=file_record.original_filename
-    )
+    return send_stored_file(file_record)
+
+@files_bp.route('/<int:file_id>/thumbnail', methods=['GET'])
+@jwt_required()
+def get_file_thumbnail(file_id):
+    current_user_id = get_jwt_identity()
+    size_name = request.args.get('size', 'medium')
+    
+    if size_name not in current_app.config['THUMBNAIL_SIZES']:
+        return jsonify({'message': 'Invalid thumbnail size'}), 400
+    
+    # Owners and users with an active share can see previews
+    file_record = File.query.filter(
+        File.id == file_id,
+        or_(
+            File.user_id == current_user_id,
+            File.shares.any(and_(
+                FileShare.shared_with_user_id == current_user_id,
+                FileShare.expires_at > datetime.utcnow()
+            ))
+        )
+    ).first()
+    
+    if not file_record:
+        return jsonify({'message': 'File not found'}), 404
+    
+    if not current_app.config['THUMBNAILS_ENABLED'] or not can_preview(file_record):
+        return jsonify({'message': 'Preview not available for this file'}), 404
+    
+    if not os.path.exists(file_record.file_path):
+        return jsonify({'message': 'File not found on disk'}), 404
+    
+    try:
+        # Content is keyed by file hash, so it never changes for a given ETag
+        response = send_thumbnail(
+            file_record, size_name,
+            mimetype='image/webp',
+            etag=f"{file_record.file_hash}-{size_name}",
+            max_age=current_app.config['THUMBNAIL_MAX_AGE']
+        )
+    except FileNotFoundError:
+        return jsonify({'message': 'Preview not available, try again'}), 404
+    except Exception as e:
+        return jsonify({'message': f'Preview generation failed: {str(e)}'}), 500
+    
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.immutable = True
+    return response
 
 @files_bp.route('/<int:file_id>', methods=['DELETE'])
 @jwt_required()
@@ -1,11 +1,13 @@
 # app/routes/sharing.py
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 import os
 from app import db
 from app.models.file import File, FileShare
 from app.models.user import User
+from app.utils.file_utils import send_stored_file
+from app.utils.rate_limit import rate_limit
 
 sharing_bp = Blueprint('sharing', __name__)
 
@@ -126,6 +128,7 @@ def get_my_shares():
 
 @sharing_bp.route('/download/<int:file_id>', methods=['GET'])
 @jwt_required()
+@rate_limit('download', concurrent=True)
 def download_shared_file(file_id):
     current_user_id = get_jwt_identity()
     
@@ -146,11 +149,7 @@ def download_shared_file(file_id):
     if not os.path.exists(file_record.file_path):
         return jsonify({'message': 'File not found on disk'}), 404
     
-    return send_file(
-        file_record.file_path,
-        as_attachment=True,
-        download_name=file_record.original_filename
-    )
+    return send_stored_file(file_record)
 
 @sharing_bp.route('/revoke/<int:share_id>', methods=['DELETE'])
 @jwt_required()
@@ -1,21 +1,36 @@
 # app/utils/auth_utils.py
 from functools import wraps
 from flask import jsonify, request
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 from app.models.user import User
 
+def _active_user_id():
+    """Return the current user's id if the user is active, trusting the is_active claim when present"""
+    current_user_id = get_jwt_identity()
+    
+    # Revoked tokens are already rejected by the blocklist loader, so the claim is safe to trust
+    claims = get_jwt()
+    if 'is_active' in claims:
+        return current_user_id if claims['is_active'] else None
+    
+    # Tokens issued before the claim existed still need the lookup
+    current_user = User.query.get(current_user_id)
+    if not current_user or not current_user.is_active:
+        return None
+    return current_user_id
+
 def token_required(f):
+    """Pass the authenticated, active user's id to the view without a database lookup"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
+            current_user_id = _active_user_id()
             
-            if not current_user or not current_user.is_active:
+            if current_user_id is None:
                 return jsonify({'message': 'Invalid or inactive user'}), 401
             
-            return f(current_user, *args, **kwargs)
+            return f(current_user_id, *args, **kwargs)
         except Exception as e:
             return jsonify({'message': 'Token is invalid'}), 401
     
@@ -26,14 +41,13 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         try:
             verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
+            current_user_id = _active_user_id()
             
-            if not current_user or not current_user.is_active:
+            if current_user_id is None:
                 return jsonify({'message': 'Invalid or inactive user'}), 401
             
             # Add admin check logic here if needed
-            return f(current_user, *args, **kwargs)
+            return f(current_user_id, *args, **kwargs)
         except Exception as e:
             return jsonify({'message': 'Token is invalid'}), 401
     
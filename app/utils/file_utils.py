@@ -2,10 +2,19 @@
 import os
 import hashlib
 import secrets
+import tempfile
+from urllib.parse import quote
 from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, request, send_file, Response, stream_with_context
 from cryptography.fernet import Fernet
 
+try:
+    import zstandard
+except ImportError:  # Compression is optional
+    zstandard = None
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
@@ -54,4 +63,99 @@ def decrypt_file(file_path, key):
     with open(file_path, 'wb') as file:
         file.write(decrypted_data)
     
-    return True
\ No newline at end of file
+    return True
+
+def should_compress(file_path, content_type):
+    """Decide whether a file is worth compressing at rest using a sampled test"""
+    config = current_app.config
+    if zstandard is None or not config.get('COMPRESSION_ENABLED'):
+        return False
+    
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype not in config['COMPRESSIBLE_CONTENT_TYPES']:
+        return False
+    
+    with open(file_path, 'rb') as f:
+        sample = f.read(config['COMPRESSION_SAMPLE_SIZE'])
+    
+    if not sample:
+        return False
+    
+    compressed = zstandard.ZstdCompressor(level=1).compress(sample)
+    return len(compressed) < len(sample) * config['COMPRESSION_MIN_RATIO']
+
+def compress_file(file_path):
+    """Compress file in place with zstd, returns the compressed size"""
+    compressor = zstandard.ZstdCompressor(level=current_app.config['COMPRESSION_LEVEL'])
+    tmp_path = f"{file_path}.zst.tmp"
+    
+    try:
+        with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            compressor.copy_stream(src, dst, size=os.path.getsize(file_path))
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return os.path.getsize(file_path)
+
+def decompress_stream(file_path):
+    """Yield decompressed chunks of a zstd-compressed file"""
+    decompressor = zstandard.ZstdDecompressor()
+    with open(file_path, 'rb') as f:
+        for chunk in decompressor.read_to_iter(f, read_size=STREAM_CHUNK_SIZE, write_size=STREAM_CHUNK_SIZE):
+            yield chunk
+
+def open_stored_file(file_record):
+    """Open a stored file for reading, decompressing into a spooled temp file if needed"""
+    if file_record.compression != 'zstd':
+        return open(file_record.file_path, 'rb')
+    
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    for chunk in decompress_stream(file_record.file_path):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+def _accepts_zstd():
+    """True only if the client names zstd explicitly with a non-zero quality"""
+    # `'zstd' in accept_encodings` also matches `zstd;q=0` and `*`; a wildcard is not
+    # enough to hand raw zstd frames to an attachment download
+    return any(
+        encoding.lower() == 'zstd' and quality > 0
+        for encoding, quality in request.accept_encodings
+    )
+
+def send_stored_file(file_record):
+    """Send a stored file, passing zstd bytes through when the client accepts them"""
+    if file_record.compression != 'zstd':
+        return send_file(
+            file_record.file_path,
+            as_attachment=True,
+            download_name=file_record.original_filename
+        )
+    
+    if _accepts_zstd():
+        response = send_file(
+            file_record.file_path,
+            mimetype=file_record.content_type,
+            as_attachment=True,
+            download_name=file_record.original_filename
+        )
+        response.headers['Content-Encoding'] = 'zstd'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    response = Response(
+        stream_with_context(decompress_stream(file_record.file_path)),
+        mimetype=file_record.content_type
+    )
+    try:
+        file_record.original_filename.encode('ascii')
+        disposition = {'filename': file_record.original_filename}
+    except UnicodeEncodeError:
+        disposition = {'filename*': f"UTF-8''{quote(file_record.original_filename)}"}
+    response.headers.set('Content-Disposition', 'attachment', **disposition)
+    response.content_length = file_record.file_size
+    response.vary.add('Accept-Encoding')
+    return response
\ No newline at end of file
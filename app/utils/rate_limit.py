@@ -0,0 +1,309 @@
+# app/utils/rate_limit.py
+import logging
+import math
+import threading
+import time
+import uuid
+from functools import wraps
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from werkzeug.wsgi import ClosingIterator, FileWrapper
+import redis
+from app.utils.redis_utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MAX_BUCKETS = 10000
+LOCAL_BUCKET_IDLE_SECONDS = 3600
+
+# Token buckets refilled by elapsed time, using Redis server time so all workers agree.
+# ARGV holds (capacity, rate) per key. A token is only taken if every bucket has one,
+# so a rejection by one bucket never drains the others.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        retry_after = math.max(retry_after, (1 - tokens) / rate)
+    end
+end
+if retry_after > 0 then
+    return {0, tostring(retry_after)}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {1, '0'}
+"""
+
+# Transfer slots are a sorted set of slot id -> acquire time. Slots older than the TTL
+# (leaked by crashed workers) are trimmed on every acquire, so rejected attempts never
+# extend anyone's lockout.
+ACQUIRE_SLOT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('EXPIRE', KEYS[1], ttl)
+return 1
+"""
+
+class RedisLimiter:
+    """Rate limit state shared by all workers through Redis"""
+    
+    def __init__(self, client):
+        self.client = client
+        self._consume = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._acquire = client.register_script(ACQUIRE_SLOT_SCRIPT)
+    
+    def consume(self, buckets):
+        keys = [f'ratelimit:{key}' for key, _, _ in buckets]
+        args = [value for _, capacity, rate in buckets for value in (capacity, rate)]
+        allowed, retry_after = self._consume(keys=keys, args=args)
+        return bool(allowed), float(retry_after)
+    
+    def acquire(self, key, slot_id, limit, ttl):
+        return bool(self._acquire(keys=[f'transfers:{key}'], args=[limit, ttl, slot_id]))
+    
+    def release(self, key, slot_id):
+        self.client.zrem(f'transfers:{key}', slot_id)
+
+class LocalLimiter:
+    """In-process fallback used when Redis is unreachable"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._slots = {}
+    
+    def consume(self, buckets):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > LOCAL_MAX_BUCKETS:
+                self._prune(now)
+            
+            levels = []
+            retry_after = 0.0
+            for key, capacity, rate in buckets:
+                tokens, ts = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - ts) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+            
+            # All or nothing, like the Redis script
+            if retry_after > 0:
+                return False, retry_after
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - 1, now)
+            return True, 0.0
+    
+    def _prune(self, now):
+        # Buckets idle this long have refilled anyway, so dropping them is lossless
+        self._buckets = {
+            key: (tokens, ts) for key, (tokens, ts) in self._buckets.items()
+            if now - ts < LOCAL_BUCKET_IDLE_SECONDS
+        }
+    
+    def acquire(self, key, slot_id, limit, ttl):
+        now = time.monotonic()
+        with self._lock:
+            slots = {
+                existing_id: acquired_at for existing_id, acquired_at in self._slots.get(key, {}).items()
+                if now - acquired_at < ttl
+            }
+            if len(slots) >= limit:
+                self._slots[key] = slots
+                return False
+            slots[slot_id] = now
+            self._slots[key] = slots
+            return True
+    
+    def release(self, key, slot_id):
+        with self._lock:
+            slots = self._slots.get(key)
+            if slots is None:
+                return
+            slots.pop(slot_id, None)
+            if not slots:
+                del self._slots[key]
+
+_local_limiter = LocalLimiter()
+_redis_limiter = None
+_redis_retry_at = 0.0
+
+def get_limiter():
+    """Return the Redis limiter, or the local one while Redis is unavailable"""
+    global _redis_limiter
+    if _redis_limiter is None and time.monotonic() >= _redis_retry_at:
+        _redis_limiter = RedisLimiter(get_redis())
+    return _redis_limiter or _local_limiter
+
+def _redis_failed(e):
+    global _redis_limiter, _redis_retry_at
+    current_app.logger.warning(f'Rate limiter falling back to in-process state: {str(e)}')
+    _redis_limiter = None
+    _redis_retry_at = time.monotonic() + current_app.config['REDIS_RETRY_SECONDS']
+
+def _client_buckets(scope, limits):
+    """Return the caller's key and the (key, capacity, rate) buckets it spends from.
+
+    Authenticated callers spend from their own bucket, plus an optional, larger
+    per-IP bucket (`<scope>_ip`) so users sharing a NAT don't share one budget.
+    Anonymous callers (e.g. login) are limited per IP.
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    
+    ip_key = f'ip:{request.remote_addr}'
+    if identity is None:
+        return ip_key, [(f'{scope}:{ip_key}', *limits[scope])]
+    
+    client_key = f'user:{identity}'
+    buckets = [(f'{scope}:{client_key}', *limits[scope])]
+    if f'{scope}_ip' in limits:
+        buckets.append((f'{scope}_ip:{ip_key}', *limits[f'{scope}_ip']))
+    return client_key, buckets
+
+def _too_many_requests(message, retry_after):
+    response = jsonify({'message': message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def _consume(limiter, buckets):
+    try:
+        return limiter.consume(buckets)
+    except redis.RedisError as e:
+        _redis_failed(e)
+        return _local_limiter.consume(buckets)
+
+def _acquire(limiter, key, slot_id, limit, ttl):
+    try:
+        return limiter.acquire(key, slot_id, limit, ttl), limiter
+    except redis.RedisError as e:
+        _redis_failed(e)
+        return _local_limiter.acquire(key, slot_id, limit, ttl), _local_limiter
+
+def _release(limiter, key, slot_id):
+    try:
+        limiter.release(key, slot_id)
+    except redis.RedisError as e:
+        # Runs after the request context is gone; the slot TTL reclaims it eventually
+        logger.warning(f'Failed to release transfer slot {key}: {str(e)}')
+
+def _release_once(limiter, key, slot_id):
+    released = []
+    
+    def release():
+        if not released:
+            released.append(True)
+            _release(limiter, key, slot_id)
+    return release
+
+class _ReleasingFile:
+    """File proxy that releases a transfer slot when the server closes it"""
+    
+    def __init__(self, file, release):
+        self._file = file
+        self._release = release
+    
+    def __getattr__(self, name):
+        # fileno(), tell(), seek() and read() pass straight through, so sendfile() still works
+        return getattr(self._file, name)
+    
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self._release()
+
+def _call_holding_slot(f, args, kwargs, release):
+    """Run the view so that the transfer slot is released once its response is closed"""
+    environ = request.environ
+    had_wrapper = 'wsgi.file_wrapper' in environ
+    server_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+    wrapped_files = []
+    
+    def releasing_file_wrapper(file, *wrapper_args, **wrapper_kwargs):
+        wrapped_files.append(file)
+        return server_wrapper(_ReleasingFile(file, release), *wrapper_args, **wrapper_kwargs)
+    
+    # send_file builds its iterator through wsgi.file_wrapper; hooking the file it wraps keeps
+    # the server's own wrapper class, which gunicorn requires before it will use sendfile()
+    environ['wsgi.file_wrapper'] = releasing_file_wrapper
+    try:
+        response = make_response(f(*args, **kwargs))
+    except Exception:
+        release()
+        raise
+    finally:
+        if had_wrapper:
+            environ['wsgi.file_wrapper'] = server_wrapper
+        else:
+            del environ['wsgi.file_wrapper']
+    
+    # Streamed (e.g. decompressed) and error responses aren't file-backed, so release
+    # when the server closes the app iterator instead
+    if not (wrapped_files and response.direct_passthrough):
+        response.response = ClosingIterator(response.response, release)
+    return response
+
+def rate_limit(scope, concurrent=False):
+    """Decorator enforcing the `scope` token bucket (and transfer slots) before the body is read"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            config = current_app.config
+            if not config.get('RATELIMIT_ENABLED'):
+                return f(*args, **kwargs)
+            
+            limiter = get_limiter()
+            client_key, buckets = _client_buckets(scope, config['RATELIMITS'])
+            
+            allowed, retry_after = _consume(limiter, buckets)
+            if not allowed:
+                return _too_many_requests('Rate limit exceeded', retry_after)
+            
+            if not concurrent:
+                return f(*args, **kwargs)
+            
+            # Concurrency is limited per user, or per IP for anonymous callers
+            slot_key = client_key
+            slot_id = uuid.uuid4().hex
+            acquired, slot_limiter = _acquire(
+                limiter, slot_key, slot_id,
+                config['MAX_CONCURRENT_TRANSFERS'],
+                config['TRANSFER_SLOT_TTL']
+            )
+            if not acquired:
+                return _too_many_requests(
+                    'Too many concurrent transfers',
+                    config['TRANSFER_RETRY_AFTER']
+                )
+            
+            # Downloads hold the slot until the server has finished sending the response
+            return _call_holding_slot(f, args, kwargs, _release_once(slot_limiter, slot_key, slot_id))
+        
+        return decorated_function
+    return decorator
\ No newline at end of file
@@ -0,0 +1,20 @@
+# app/utils/redis_utils.py
+from flask import current_app
+import redis
+
+_clients = {}
+
+def get_redis():
+    """Return a per-process Redis client for the configured REDIS_URL"""
+    url = current_app.config['REDIS_URL']
+    client = _clients.get(url)
+    if client is None:
+        timeout = current_app.config['REDIS_SOCKET_TIMEOUT']
+        client = redis.Redis.from_url(
+            url,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+            decode_responses=True
+        )
+        _clients[url] = client
+    return client
\ No newline at end of file
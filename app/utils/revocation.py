@@ -0,0 +1,177 @@
+# app/utils/revocation.py
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+import redis
+from app.utils.redis_utils import get_redis
+
+# Redis layout:
+#   revoked:jti:<jti>  -> '1', expires together with the token
+#   revoked:users      -> hash of user_id -> unix time before which all tokens are revoked
+#   revoked:log        -> sorted set of 'jti:<jti>' / 'user:<id>' scored by revocation time,
+#                         read incrementally by every worker to refresh its bloom filter
+JTI_KEY = 'revoked:jti:{}'
+USERS_KEY = 'revoked:users'
+LOG_KEY = 'revoked:log'
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (no false negatives)"""
+    
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+    
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationCache:
+    """Per-process mirror of the Redis blocklist, refreshed incrementally"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bloom = None
+        self.user_cutoffs = {}
+        self.synced_at = None  # Redis server time of the last sync
+        self.next_sync_at = 0.0
+        self.next_rebuild_at = 0.0
+    
+    def refresh(self, client, config):
+        if time.monotonic() < self.next_sync_at:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            if now < self.next_sync_at:
+                return
+            
+            try:
+                if self.bloom is None or now >= self.next_rebuild_at:
+                    self._rebuild(client, config)
+                    self.next_rebuild_at = now + config['REVOCATION_REBUILD_INTERVAL']
+                else:
+                    self._sync(client, config)
+            finally:
+                # Whether or not Redis answered, don't retry on every request
+                self.next_sync_at = now + config['REVOCATION_SYNC_INTERVAL']
+    
+    def _rebuild(self, client, config):
+        # Bloom filters can't forget, so periodically start over to drop expired entries
+        server_time = _server_time(client)
+        oldest = server_time - _max_token_lifetime(config)
+        client.zremrangebyscore(LOG_KEY, '-inf', oldest)
+        members = client.zrange(LOG_KEY, 0, -1)
+        cutoffs = {user_id: float(cutoff) for user_id, cutoff in client.hgetall(USERS_KEY).items()}
+        
+        expired = [user_id for user_id, cutoff in cutoffs.items() if cutoff < oldest]
+        if expired:
+            client.hdel(USERS_KEY, *expired)
+        
+        bloom = BloomFilter(
+            max(config['REVOCATION_BLOOM_CAPACITY'], 2 * len(members)),
+            config['REVOCATION_BLOOM_ERROR_RATE']
+        )
+        for member in members:
+            if member.startswith('jti:'):
+                bloom.add(member[4:])
+        
+        self.bloom = bloom
+        self.user_cutoffs = {user_id: cutoff for user_id, cutoff in cutoffs.items() if cutoff >= oldest}
+        self.synced_at = server_time
+    
+    def _sync(self, client, config):
+        server_time = _server_time(client)
+        # Overlap the window slightly so revocations racing the previous sync aren't missed
+        members = client.zrangebyscore(LOG_KEY, self.synced_at - config['REVOCATION_SYNC_OVERLAP'], '+inf')
+        
+        user_ids = []
+        for member in members:
+            kind, _, value = member.partition(':')
+            if kind == 'jti':
+                self.bloom.add(value)
+            elif kind == 'user':
+                user_ids.append(value)
+        
+        if user_ids:
+            for user_id, cutoff in zip(user_ids, client.hmget(USERS_KEY, user_ids)):
+                if cutoff is not None:
+                    self.user_cutoffs[user_id] = float(cutoff)
+        
+        self.synced_at = server_time
+    
+    def add_local(self, config, jti=None, user_id=None, cutoff=None):
+        # Takes effect in this worker immediately, even if Redis is unreachable
+        with self._lock:
+            if jti is not None:
+                if self.bloom is None:
+                    self.bloom = BloomFilter(config['REVOCATION_BLOOM_CAPACITY'], config['REVOCATION_BLOOM_ERROR_RATE'])
+                self.bloom.add(jti)
+            if user_id is not None:
+                self.user_cutoffs[str(user_id)] = cutoff
+
+_cache = RevocationCache()
+
+def _server_time(client):
+    seconds, microseconds = client.time()
+    return seconds + microseconds / 1000000
+
+def _max_token_lifetime(config):
+    return max(config['JWT_ACCESS_TOKEN_EXPIRES'], config['JWT_REFRESH_TOKEN_EXPIRES']).total_seconds()
+
+def revoke_token(jwt_payload):
+    """Revoke a single token until it expires"""
+    jti = jwt_payload['jti']
+    ttl = max(1, int(jwt_payload['exp'] - datetime.now(timezone.utc).timestamp()))
+    _cache.add_local(current_app.config, jti=jti)
+    
+    client = get_redis()
+    pipe = client.pipeline()
+    pipe.set(JTI_KEY.format(jti), '1', ex=ttl)
+    pipe.zadd(LOG_KEY, {f'jti:{jti}': _server_time(client)})
+    pipe.execute()
+
+def revoke_user_tokens(user_id):
+    """Revoke every token issued to a user up to now"""
+    cutoff = datetime.now(timezone.utc).timestamp()
+    _cache.add_local(current_app.config, user_id=user_id, cutoff=cutoff)
+    
+    client = get_redis()
+    pipe = client.pipeline()
+    pipe.hset(USERS_KEY, str(user_id), cutoff)
+    pipe.zadd(LOG_KEY, {f'user:{user_id}': _server_time(client)})
+    pipe.execute()
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """Blocklist loader: answered from the local bloom filter, Redis is only asked on a bloom hit"""
+    config = current_app.config
+    try:
+        _cache.refresh(get_redis(), config)
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Revocation sync failed, using cached blocklist: {str(e)}')
+    
+    cutoff = _cache.user_cutoffs.get(str(jwt_payload['sub']))
+    if cutoff is not None and jwt_payload['iat'] <= cutoff:
+        return True
+    
+    jti = jwt_payload.get('jti')
+    if jti is None or _cache.bloom is None or jti not in _cache.bloom:
+        return False
+    
+    # Possible false positive, confirm against the authoritative key
+    try:
+        return bool(get_redis().exists(JTI_KEY.format(jti)))
+    except redis.RedisError:
+        return True
\ No newline at end of file
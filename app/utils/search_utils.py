@@ -0,0 +1,166 @@
+# app/utils/search_utils.py
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+from app.models.file import File
+from app.utils.file_utils import open_stored_file
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF text extraction is optional
+    PdfReader = None
+
+try:
+    import docx
+except ImportError:  # DOCX text extraction is optional
+    docx = None
+
+_executor = None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config['SEARCH_EXTRACTION_WORKERS'],
+            thread_name_prefix='text-extract'
+        )
+    return _executor
+
+def content_search_vector():
+    """tsvector over content_text, spelled exactly like idx_files_content_tsv so Postgres can use it"""
+    # Literal '' rather than a bound parameter: the planner only matches identical expressions
+    return db.func.to_tsvector(
+        db.literal_column("'simple'::regconfig"),
+        db.func.coalesce(File.content_text, db.literal_column("''"))
+    )
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def encode_cursor(file_record):
+    """Encode a keyset pagination cursor from the last file of a page"""
+    raw = f"{file_record.created_at.isoformat()}|{file_record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a keyset cursor, returns (created_at, id) or None if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, file_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(file_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def extract_text(file_record):
+    """Extract plain text from txt, pdf and docx files"""
+    extension = file_record.original_filename.rsplit('.', 1)[-1].lower()
+    max_chars = current_app.config['SEARCH_EXTRACTION_MAX_CHARS']
+    
+    with open_stored_file(file_record) as f:
+        if extension == 'txt':
+            text = f.read(max_chars * 4).decode('utf-8', errors='ignore')
+        elif extension == 'pdf' and PdfReader is not None:
+            reader = PdfReader(f)
+            parts = []
+            length = 0
+            for page in reader.pages:
+                page_text = page.extract_text() or ''
+                parts.append(page_text)
+                length += len(page_text)
+                if length >= max_chars:
+                    break
+            text = '\n'.join(parts)
+        elif extension == 'docx' and docx is not None:
+            document = docx.Document(io.BytesIO(f.read()))
+            text = '\n'.join(paragraph.text for paragraph in document.paragraphs)
+        else:
+            return None
+    
+    # Postgres text columns cannot hold NUL characters
+    return text[:max_chars].replace('\x00', '')
+
+def _is_extractable(filename):
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return extension in current_app.config['SEARCH_EXTRACTABLE_EXTENSIONS']
+
+def index_file_content(file_record):
+    """Store the file's extracted text without touching updated_at, returns True if indexed"""
+    text = extract_text(file_record)
+    if text is None:
+        return False
+    
+    # Indexing isn't a user edit, so keep updated_at instead of letting onupdate bump it
+    db.session.execute(
+        db.update(File)
+        .where(File.id == file_record.id)
+        .values(content_text=text, updated_at=File.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return True
+
+def _index_file_content(app, file_id):
+    with app.app_context():
+        try:
+            file_record = File.query.get(file_id)
+            if file_record:
+                index_file_content(file_record)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f'Text extraction failed for file {file_id}: {str(e)}')
+        finally:
+            db.session.remove()
+
+def schedule_text_extraction(file_record):
+    """Queue background text extraction for searchable file types"""
+    config = current_app.config
+    if not config.get('SEARCH_EXTRACTION_ENABLED'):
+        return False
+    
+    if not _is_extractable(file_record.original_filename):
+        return False
+    
+    app = current_app._get_current_object()
+    _get_executor().submit(_index_file_content, app, file_record.id)
+    return True
+
+@click.command('backfill-search')
+@click.option('--batch-size', default=100, show_default=True, help='Files loaded per query')
+@with_appcontext
+def backfill_search_command(batch_size):
+    """Extract text for files uploaded before search indexing (content_text IS NULL)"""
+    indexed = failed = 0
+    last_id = 0
+    while True:
+        # Keyset on id, so rows that stay NULL (unsupported or failed) aren't loaded again
+        batch = (
+            File.query
+            .filter(File.content_text.is_(None), File.id > last_id)
+            .order_by(File.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        
+        for file_record in batch:
+            if not _is_extractable(file_record.original_filename):
+                continue
+            try:
+                if index_file_content(file_record):
+                    indexed += 1
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                click.echo(f'File {file_record.id}: {str(e)}', err=True)
+        
+        db.session.expunge_all()
+    
+    click.echo(f'Indexed {indexed} files, {failed} failed')
\ No newline at end of file
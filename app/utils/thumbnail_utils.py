@@ -0,0 +1,251 @@
+# app/utils/thumbnail_utils.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, send_file
+import redis
+from app import db
+from app.models.file import File
+from app.utils.file_utils import open_stored_file
+from app.utils.redis_utils import get_redis
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Image previews are optional
+    Image = None
+
+try:
+    import pypdfium2
+except ImportError:  # PDF previews are optional
+    pypdfium2 = None
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# Cache size is shared by all workers through Redis so eviction sees every write
+CACHE_BYTES_KEY = 'thumbnails:bytes'
+EVICT_LOCK_KEY = 'thumbnails:evict-lock'
+EVICT_LOCK_SECONDS = 300
+
+# Increment the counter only while it still has its expiry. A missing key, or one that
+# lost its TTL, returns nil so the caller reseeds it from disk instead of INCRBY
+# creating a counter that never expires.
+INCREMENT_CACHE_BYTES_SCRIPT = """
+if redis.call('TTL', KEYS[1]) < 0 then
+    return false
+end
+return redis.call('INCRBY', KEYS[1], ARGV[1])
+"""
+
+_executor = None
+_cache_lock = threading.Lock()
+_pdfium_lock = threading.Lock()
+_cache_bytes = None  # Fallback estimate for this process while Redis is unavailable
+_cache_rescan_at = 0.0
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config['THUMBNAIL_WORKERS'],
+            thread_name_prefix='thumbnail'
+        )
+    return _executor
+
+def _extension(file_record):
+    return file_record.original_filename.rsplit('.', 1)[-1].lower()
+
+def thumbnail_folder():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], current_app.config['THUMBNAIL_SUBFOLDER'])
+
+def thumbnail_path(file_hash, size_name):
+    """Thumbnails are keyed by content hash, so identical uploads share one entry"""
+    return os.path.join(thumbnail_folder(), file_hash[:2], f"{file_hash}_{size_name}.webp")
+
+def can_preview(file_record):
+    extension = _extension(file_record)
+    if extension in IMAGE_EXTENSIONS:
+        return Image is not None
+    if extension == 'pdf':
+        return Image is not None and pypdfium2 is not None
+    return False
+
+def _render_pdf_first_page(data, max_dimension):
+    # PDFium is not thread-safe, even across documents. Every pypdfium2 object is
+    # created and closed under the lock so no finalizer runs PDFium code concurrently.
+    with _pdfium_lock:
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            page = pdf[0]
+            try:
+                width, height = page.get_size()
+                scale = max_dimension / max(width, height, 1)
+                bitmap = page.render(scale=scale)
+                try:
+                    # Copy out of the PDFium-owned buffer before it is released
+                    return bitmap.to_pil().copy()
+                finally:
+                    bitmap.close()
+            finally:
+                page.close()
+        finally:
+            pdf.close()
+
+def _open_source_image(file_record, max_dimension):
+    """Load the image, or render the first page of a PDF, at roughly the largest thumbnail size"""
+    with open_stored_file(file_record) as f:
+        if _extension(file_record) == 'pdf':
+            return _render_pdf_first_page(f.read(), max_dimension)
+        
+        image = Image.open(f)
+        # Let the JPEG decoder downscale while decoding instead of loading full resolution
+        image.draft('RGB', (max_dimension, max_dimension))
+        image.load()
+        return ImageOps.exif_transpose(image)
+
+def generate_thumbnails(file_record):
+    """Render every configured thumbnail size that isn't cached yet, returns bytes written"""
+    sizes = current_app.config['THUMBNAIL_SIZES']
+    missing = {
+        name: dimension for name, dimension in sizes.items()
+        if not os.path.exists(thumbnail_path(file_record.file_hash, name))
+    }
+    if not missing:
+        return 0
+    
+    source = _open_source_image(file_record, max(missing.values()))
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if 'transparency' in source.info or source.mode in ('LA', 'PA') else 'RGB')
+    
+    written = 0
+    # Largest first, so each smaller size is resampled from an already reduced image
+    for name, dimension in sorted(missing.items(), key=lambda item: item[1], reverse=True):
+        path = thumbnail_path(file_record.file_hash, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        source.thumbnail((dimension, dimension), Image.LANCZOS)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        source.save(tmp_path, 'WEBP', quality=current_app.config['THUMBNAIL_QUALITY'])
+        os.replace(tmp_path, path)
+        written += os.path.getsize(path)
+    
+    _account(written)
+    return written
+
+def get_thumbnail(file_record, size_name):
+    """Return the cached thumbnail path, generating it on a cache miss"""
+    path = thumbnail_path(file_record.file_hash, size_name)
+    if not os.path.exists(path):
+        generate_thumbnails(file_record)
+    else:
+        # Bump mtime so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return path
+
+def send_thumbnail(file_record, size_name, **kwargs):
+    """send_file a thumbnail, regenerating it once if another worker evicts it in between"""
+    try:
+        return send_file(get_thumbnail(file_record, size_name), **kwargs)
+    except FileNotFoundError:
+        # send_file opens the file right away, so a second miss means it keeps getting evicted
+        return send_file(get_thumbnail(file_record, size_name), **kwargs)
+
+def _account(written):
+    config = current_app.config
+    max_bytes = config['THUMBNAIL_CACHE_MAX_BYTES']
+    target_bytes = int(max_bytes * config['THUMBNAIL_CACHE_LOW_WATERMARK'])
+    
+    try:
+        client = get_redis()
+        total = _shared_cache_bytes(client, written, config['THUMBNAIL_CACHE_RESCAN_SECONDS'])
+        
+        # Only one worker scans and evicts at a time
+        if total > max_bytes and client.set(EVICT_LOCK_KEY, '1', nx=True, ex=EVICT_LOCK_SECONDS):
+            try:
+                remaining = _evict(target_bytes)
+                client.set(CACHE_BYTES_KEY, remaining, ex=config['THUMBNAIL_CACHE_RESCAN_SECONDS'])
+            finally:
+                client.delete(EVICT_LOCK_KEY)
+        return
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Thumbnail cache accounting falling back to local scans: {str(e)}')
+    
+    _account_locally(written, max_bytes, target_bytes, config['THUMBNAIL_CACHE_RESCAN_SECONDS'])
+
+def _shared_cache_bytes(client, written, rescan_seconds):
+    """Add `written` to the shared counter, seeding it from disk when missing or expired"""
+    increment = client.register_script(INCREMENT_CACHE_BYTES_SCRIPT)
+    total = increment(keys=[CACHE_BYTES_KEY], args=[written])
+    if total is not None:
+        return int(total)
+    
+    # The key expires every rescan_seconds, so drift from crashes or manual deletes self-corrects.
+    # The scan already includes `written`, and always sets a fresh TTL.
+    total = _scan_cache()[1]
+    client.set(CACHE_BYTES_KEY, total, ex=rescan_seconds)
+    return total
+
+def _account_locally(written, max_bytes, target_bytes, rescan_seconds):
+    global _cache_bytes, _cache_rescan_at
+    with _cache_lock:
+        # Other workers write too, so rescan regularly instead of trusting our own count
+        if _cache_bytes is None or time.monotonic() >= _cache_rescan_at:
+            _cache_bytes = _scan_cache()[1]
+            _cache_rescan_at = time.monotonic() + rescan_seconds
+        else:
+            _cache_bytes += written
+        
+        if _cache_bytes > max_bytes:
+            _cache_bytes = _evict(target_bytes)
+
+def _scan_cache():
+    entries = []
+    total = 0
+    for root, _, filenames in os.walk(thumbnail_folder()):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    return entries, total
+
+def _evict(target_bytes):
+    """Remove least recently used thumbnails until the cache fits in target_bytes"""
+    # Evicting down to a low watermark keeps full directory scans rare
+    entries, total = _scan_cache()
+    entries.sort()
+    for _, size, path in entries:
+        if total <= target_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+    return total
+
+def _generate_in_background(app, file_id):
+    with app.app_context():
+        try:
+            file_record = File.query.get(file_id)
+            if file_record:
+                generate_thumbnails(file_record)
+        except Exception as e:
+            app.logger.warning(f'Thumbnail generation failed for file {file_id}: {str(e)}')
+        finally:
+            db.session.remove()
+
+def schedule_thumbnails(file_record):
+    """Queue background thumbnail generation for previewable uploads"""
+    if not current_app.config.get('THUMBNAILS_ENABLED') or not can_preview(file_record):
+        return False
+    
+    app = current_app._get_current_object()
+    _get_executor().submit(_generate_in_background, app, file_record.id)
+    return True
\ No newline at end of file
@@ -1,6 +1,7 @@
-# init.sql
+-- init.sql
 -- Create database and user if they don't exist
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_files_user_id ON files(user_id);
@@ -0,0 +1,28 @@
+"""add compression columns to files
+
+Revision ID: 3f9c2a1b7d4e
+Revises:
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a1b7d4e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# The files table predates migrations and may come from db.create_all() with or
+# without these columns, so every statement is idempotent.
+def upgrade():
+    op.execute('ALTER TABLE files ADD COLUMN IF NOT EXISTS compression VARCHAR(20)')
+    op.execute('ALTER TABLE files ADD COLUMN IF NOT EXISTS stored_size INTEGER')
+
+
+def downgrade():
+    op.execute('ALTER TABLE files DROP COLUMN IF EXISTS stored_size')
+    op.execute('ALTER TABLE files DROP COLUMN IF EXISTS compression')
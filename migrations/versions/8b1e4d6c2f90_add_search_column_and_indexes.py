@@ -0,0 +1,41 @@
+"""add search column and indexes to files
+
+Revision ID: 8b1e4d6c2f90
+Revises: 3f9c2a1b7d4e
+Create Date: 2026-10-19 12:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d6c2f90'
+down_revision = '3f9c2a1b7d4e'
+branch_labels = None
+depends_on = None
+
+
+# Idempotent for the same reason as 3f9c2a1b7d4e: the table may come from db.create_all()
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.execute('ALTER TABLE files ADD COLUMN IF NOT EXISTS content_text TEXT')
+
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS idx_files_original_filename_trgm '
+        'ON files USING gin (original_filename gin_trgm_ops)'
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS idx_files_content_tsv '
+        "ON files USING gin (to_tsvector('simple', coalesce(content_text, '')))"
+    )
+    op.execute('CREATE INDEX IF NOT EXISTS idx_files_user_created_id ON files (user_id, created_at, id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS idx_files_user_created_id')
+    op.execute('DROP INDEX IF EXISTS idx_files_content_tsv')
+    op.execute('DROP INDEX IF EXISTS idx_files_original_filename_trgm')
+
+    op.execute('ALTER TABLE files DROP COLUMN IF EXISTS content_text')
@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# Config reads the environment at import time, so point it at throwaway storage first
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='vault-uploads-'))
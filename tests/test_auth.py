@@ -0,0 +1,43 @@
+# tests/test_auth.py
+import pytest
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from app import create_app
+from app.utils import revocation
+
+@pytest.fixture
+def client(monkeypatch):
+    server = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(revocation, 'get_redis', lambda: server)
+    monkeypatch.setattr(revocation, '_cache', revocation.RevocationCache())
+    
+    app = create_app()
+    app.config['RATELIMIT_ENABLED'] = False
+    with app.app_context():
+        client = app.test_client()
+        client.access_token = create_access_token(identity='1', additional_claims={'is_active': True})
+        client.refresh_token = create_refresh_token(identity='1', additional_claims={'is_active': True})
+        client.other_refresh_token = create_refresh_token(identity='2', additional_claims={'is_active': True})
+        yield client
+
+def logout(client, access_token, body):
+    return client.post('/auth/logout', json=body, headers={'Authorization': f'Bearer {access_token}'})
+
+def test_logout_revokes_access_and_refresh_tokens(client):
+    response = logout(client, client.access_token, {'refresh_token': client.refresh_token})
+    assert response.status_code == 200
+    
+    refresh = client.post('/auth/refresh', headers={'Authorization': f'Bearer {client.refresh_token}'})
+    assert refresh.status_code == 401
+    assert logout(client, client.access_token, {'refresh_token': client.refresh_token}).status_code == 401
+
+@pytest.mark.parametrize('refresh_token', [None, 'not-a-jwt', 'access', 'other_user'])
+def test_logout_requires_the_callers_refresh_token(client, refresh_token):
+    tokens = {'access': client.access_token, 'other_user': client.other_refresh_token}
+    body = {'refresh_token': tokens.get(refresh_token, refresh_token)} if refresh_token else {'token': 'x'}
+    
+    assert logout(client, client.access_token, body).status_code == 400
+    # Nothing was revoked by the rejected call
+    assert logout(client, client.access_token, {'refresh_token': client.refresh_token}).status_code == 200
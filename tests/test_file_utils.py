@@ -0,0 +1,57 @@
+# tests/test_file_utils.py
+from types import SimpleNamespace
+import pytest
+from flask import Flask
+from app.utils.file_utils import _accepts_zstd, should_compress, compress_file, send_stored_file
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('zstd', True),
+    ('gzip, zstd;q=0.5', True),
+    ('zstd;q=0', False),
+    ('*', False),
+    ('gzip, deflate', False),
+])
+def test_zstd_passthrough_requires_explicit_acceptance(accept_encoding, expected):
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept-Encoding': accept_encoding}):
+        assert _accepts_zstd() is expected
+
+def test_compressed_file_round_trip(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    original = b''.join(f'line {i}: the quick brown fox jumps over the lazy dog\n'.encode() for i in range(5000))
+    path = tmp_path / 'stored'
+    path.write_bytes(original)
+    record = SimpleNamespace(
+        file_path=str(path), original_filename='notes.txt', content_type='text/plain',
+        file_size=len(original), compression=None
+    )
+    
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    app.config['COMPRESSION_ENABLED'] = True
+    app.add_url_rule('/download', 'download', lambda: send_stored_file(record))
+    
+    with app.app_context():
+        assert should_compress(record.file_path, 'text/plain; charset=utf-8')
+        stored_size = compress_file(record.file_path)
+    record.compression = 'zstd'
+    assert stored_size < len(original)
+    
+    client = app.test_client()
+    
+    # Clients without zstd get the original bytes, with the original length
+    response = client.get('/download', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.data == original
+    assert response.content_length == record.file_size
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    
+    # Clients accepting zstd get the stored frame as-is
+    response = client.get('/download', headers={'Accept-Encoding': 'zstd'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'zstd'
+    assert 'Accept-Encoding' in response.vary
+    assert response.data == path.read_bytes()
+    assert response.content_length == stored_size
+    assert zstandard.ZstdDecompressor().decompress(response.data) == original
\ No newline at end of file
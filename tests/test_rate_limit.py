@@ -0,0 +1,180 @@
+# tests/test_rate_limit.py
+import pytest
+from flask import Flask, Response, send_file
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+from werkzeug.test import EnvironBuilder
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from app.utils import rate_limit as rate_limit_module
+from app.utils.rate_limit import rate_limit
+
+# Minimal 1x1 PNG
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+class ServerFileWrapper:
+    """Stand-in for gunicorn's wsgi.file_wrapper, which only uses sendfile() on its own instances"""
+    
+    def __init__(self, filelike, blksize=8192):
+        self.filelike = filelike
+        self.blksize = blksize
+        if hasattr(filelike, 'close'):
+            self.close = filelike.close
+    
+    def __iter__(self):
+        return iter(lambda: self.filelike.read(self.blksize), b'')
+
+@pytest.fixture(params=['redis', 'local'])
+def client(request, tmp_path, monkeypatch):
+    server = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(rate_limit_module, 'get_redis', lambda: server)
+    monkeypatch.setattr(rate_limit_module, '_redis_limiter', None)
+    monkeypatch.setattr(rate_limit_module, '_local_limiter', rate_limit_module.LocalLimiter())
+    if request.param == 'local':
+        # Pretend Redis failed recently so the in-process limiter is used
+        monkeypatch.setattr(rate_limit_module, '_redis_retry_at', float('inf'))
+    else:
+        monkeypatch.setattr(rate_limit_module, '_redis_retry_at', 0.0)
+    
+    image_path = tmp_path / 'image.png'
+    image_path.write_bytes(PNG_BYTES)
+    
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    app.config['RATELIMITS'] = {'download': (1000, 1000)}
+    JWTManager(app)
+    
+    @app.route('/download')
+    @jwt_required()
+    @rate_limit('download', concurrent=True)
+    def download():
+        return send_file(str(image_path), as_attachment=True, download_name='image.png')
+    
+    @app.route('/stream')
+    @jwt_required()
+    @rate_limit('download', concurrent=True)
+    def stream():
+        return Response(iter([PNG_BYTES]), mimetype='image/png')
+    
+    with app.app_context():
+        token = create_access_token(identity='1')
+    
+    test_client = app.test_client()
+    test_client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    test_client.environ_base['wsgi.file_wrapper'] = ServerFileWrapper
+    test_client.max_transfers = app.config['MAX_CONCURRENT_TRANSFERS']
+    return test_client
+
+def test_sequential_send_file_downloads_release_their_slot(client):
+    for _ in range(client.max_transfers + 1):
+        response = client.get('/download')
+        assert response.status_code == 200
+        assert response.data == PNG_BYTES
+        response.close()
+
+def test_send_file_keeps_server_file_wrapper(client):
+    for _ in range(client.max_transfers + 1):
+        # Call the WSGI app directly: the test client wraps the app iterator itself
+        environ = EnvironBuilder(path='/download', environ_base=client.environ_base).get_environ()
+        app_iter = client.application(environ, lambda status, headers, exc_info=None: None)
+        
+        # Anything else makes gunicorn fall back to copying the file through Python
+        assert type(app_iter) is ServerFileWrapper
+        assert isinstance(app_iter.filelike.fileno(), int)
+        assert b''.join(app_iter) == PNG_BYTES
+        app_iter.close()
+
+def test_streamed_downloads_release_their_slot(client):
+    for _ in range(client.max_transfers + 1):
+        response = client.get('/stream')
+        assert response.status_code == 200
+        assert response.data == PNG_BYTES
+        response.close()
+
+def test_concurrent_downloads_are_capped(client):
+    open_responses = [client.get('/download') for _ in range(client.max_transfers)]
+    assert all(response.status_code == 200 for response in open_responses)
+    
+    rejected = client.get('/download')
+    assert rejected.status_code == 429
+    assert int(rejected.headers['Retry-After']) >= 1
+    
+    open_responses[0].close()
+    assert client.get('/download', buffered=True).status_code == 200
+
+def test_leaked_slots_expire_despite_rejected_retries():
+    server = fakeredis.FakeRedis(decode_responses=True)
+    limiter = rate_limit_module.RedisLimiter(server)
+    seconds, _ = server.time()
+    
+    # Both slots were leaked by a crashed worker, one of them an hour ago
+    server.zadd('transfers:user:1', {'leaked-old': seconds - 3600, 'leaked-new': seconds})
+    assert not limiter.acquire('user:1', 'retry', 1, 60)
+    assert server.zcard('transfers:user:1') == 1
+    assert server.ttl('transfers:user:1') == -1  # Rejected attempts don't extend the lockout
+    
+    server.zadd('transfers:user:1', {'leaked-new': seconds - 3600})
+    assert limiter.acquire('user:1', 'retry', 1, 60)
+    assert server.zrange('transfers:user:1', 0, -1) == ['retry']
+    
+    limiter.release('user:1', 'retry')
+    assert server.zcard('transfers:user:1') == 0
+@pytest.fixture(params=['redis', 'local'])
+def limiter(request):
+    if request.param == 'redis':
+        return rate_limit_module.RedisLimiter(fakeredis.FakeRedis(decode_responses=True))
+    return rate_limit_module.LocalLimiter()
+
+def test_rejected_bucket_does_not_drain_the_others(limiter):
+    user_bucket = ('upload:user:1', 5, 0.001)
+    ip_bucket = ('upload_ip:ip:10.0.0.1', 1, 0.001)
+    assert limiter.consume([user_bucket, ip_bucket])[0]
+    
+    for _ in range(3):
+        allowed, retry_after = limiter.consume([user_bucket, ip_bucket])
+        assert not allowed
+        assert retry_after > 0
+    
+    # Only the first request was charged to the user
+    for _ in range(4):
+        assert limiter.consume([user_bucket])[0]
+    assert not limiter.consume([user_bucket])[0]
+
+def test_users_behind_one_ip_have_their_own_buckets(monkeypatch):
+    server = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(rate_limit_module, 'get_redis', lambda: server)
+    monkeypatch.setattr(rate_limit_module, '_redis_limiter', None)
+    monkeypatch.setattr(rate_limit_module, '_redis_retry_at', 0.0)
+    
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    app.config['RATELIMITS'] = {'upload': (2, 0.001), 'upload_ip': (3, 0.001), 'login': (1, 0.001)}
+    JWTManager(app)
+    
+    @app.route('/upload', methods=['POST'])
+    @jwt_required()
+    @rate_limit('upload')
+    def upload():
+        return 'ok'
+    
+    @app.route('/login', methods=['POST'])
+    @rate_limit('login')
+    def login():
+        return 'ok'
+    
+    with app.app_context():
+        tokens = [create_access_token(identity=str(user_id)) for user_id in (1, 2)]
+    test_client = app.test_client()
+    
+    def upload_as(token):
+        return test_client.post('/upload', headers={'Authorization': f'Bearer {token}'}).status_code
+    
+    assert [upload_as(tokens[0]) for _ in range(3)] == [200, 200, 429]
+    # The second user has a full bucket, until the shared per-IP ceiling is reached
+    assert [upload_as(tokens[1]) for _ in range(2)] == [200, 429]
+    
+    # Anonymous callers are limited per IP by the scope's own entry
+    assert [test_client.post('/login').status_code for _ in range(2)] == [200, 429]
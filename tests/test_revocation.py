@@ -0,0 +1,110 @@
+# tests/test_revocation.py
+import uuid
+from datetime import datetime, timezone
+import pytest
+from flask import Flask
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from app.utils import revocation
+from app.utils.revocation import RevocationCache, revoke_token, revoke_user_tokens, is_token_revoked
+
+class FakeClock:
+    """Replaces the time module so sync intervals can be stepped through"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(revocation, 'get_redis', lambda: server)
+    monkeypatch.setattr(revocation, '_cache', RevocationCache())
+    return server
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(revocation, 'time', clock)
+    return clock
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    with app.app_context():
+        yield app
+
+def make_payload(user_id='1', iat=None, token_type='access'):
+    now = datetime.now(timezone.utc).timestamp()
+    iat = now if iat is None else iat
+    return {'sub': user_id, 'iat': iat, 'exp': iat + 3600, 'jti': uuid.uuid4().hex, 'type': token_type}
+
+def as_worker(monkeypatch, cache):
+    monkeypatch.setattr(revocation, '_cache', cache)
+
+def test_logout_reaches_other_workers_after_one_sync_interval(app, server, clock, monkeypatch):
+    payload = make_payload()
+    other_worker = RevocationCache()
+    as_worker(monkeypatch, other_worker)
+    assert not is_token_revoked({}, payload)
+    
+    as_worker(monkeypatch, RevocationCache())
+    revoke_token(payload)
+    assert is_token_revoked({}, payload)
+    
+    # The other worker answers from its cache until its next sync
+    as_worker(monkeypatch, other_worker)
+    assert not is_token_revoked({}, payload)
+    clock.now += app.config['REVOCATION_SYNC_INTERVAL']
+    assert is_token_revoked({}, payload)
+
+def test_user_cutoff_rejects_earlier_tokens_only(app, server, clock, monkeypatch):
+    other_worker = RevocationCache()
+    as_worker(monkeypatch, other_worker)
+    assert not is_token_revoked({}, make_payload())
+    
+    as_worker(monkeypatch, RevocationCache())
+    revoke_user_tokens(1)
+    cutoff = float(server.hget(revocation.USERS_KEY, '1'))
+    
+    clock.now += app.config['REVOCATION_SYNC_INTERVAL']
+    for worker in (revocation._cache, other_worker):
+        as_worker(monkeypatch, worker)
+        assert is_token_revoked({}, make_payload(iat=cutoff - 60))
+        assert is_token_revoked({}, make_payload(iat=cutoff))
+        assert not is_token_revoked({}, make_payload(iat=cutoff + 1))
+        assert not is_token_revoked({}, make_payload(user_id='2', iat=cutoff - 60))
+
+def test_rebuild_drops_expired_entries(app, server, clock):
+    seconds, _ = server.time()
+    expired = seconds - revocation._max_token_lifetime(app.config) - 60
+    server.zadd(revocation.LOG_KEY, {'jti:expired': expired, 'jti:recent': seconds, 'user:7': expired})
+    server.hset(revocation.USERS_KEY, mapping={'7': expired, '8': seconds})
+    
+    cache = RevocationCache()
+    cache.refresh(server, app.config)
+    
+    assert server.zrange(revocation.LOG_KEY, 0, -1) == ['jti:recent']
+    assert server.hgetall(revocation.USERS_KEY) == {'8': str(seconds)}
+    assert cache.user_cutoffs == {'8': float(seconds)}
+    assert 'recent' in cache.bloom
+    assert 'expired' not in cache.bloom
+
+def test_bloom_false_positive_is_checked_against_redis(app, server, clock):
+    # A tiny filter with many revocations makes every lookup a bloom hit
+    app.config['REVOCATION_BLOOM_CAPACITY'] = 1
+    app.config['REVOCATION_BLOOM_ERROR_RATE'] = 0.5
+    assert not is_token_revoked({}, make_payload())  # Initial build
+    for _ in range(50):
+        revoke_token(make_payload())
+    
+    payload = make_payload()
+    assert payload['jti'] in revocation._cache.bloom
+    assert not is_token_revoked({}, payload)
+    
+    server.set(revocation.JTI_KEY.format(payload['jti']), '1')
+    assert is_token_revoked({}, payload)
@@ -0,0 +1,126 @@
+# tests/test_search.py
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects import postgresql
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from app import create_app, db
+from app.models.file import File, FileShare
+from app.models.user import User
+from app.utils import revocation
+from app.utils.search_utils import content_search_vector, index_file_content
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    server = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(revocation, 'get_redis', lambda: server)
+    monkeypatch.setattr(revocation, '_cache', revocation.RevocationCache())
+    
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def make_user(username):
+    user = User(username=username, email=f'{username}@example.com')
+    user.set_password('Password123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def make_file(tmp_path, user, name, data=b'', **kwargs):
+    path = tmp_path / f'{name}.stored'
+    path.write_bytes(data)
+    file_record = File(
+        filename=f'{name}.stored', original_filename=name, file_path=str(path),
+        file_size=len(data), content_type='text/plain', file_hash='0' * 64,
+        user_id=user.id, **kwargs
+    )
+    db.session.add(file_record)
+    db.session.commit()
+    return file_record
+
+def test_indexing_keeps_updated_at(app, tmp_path):
+    updated_at = datetime(2020, 1, 1)
+    file_record = make_file(tmp_path, make_user('alice'), 'notes.txt', b'quarterly report', updated_at=updated_at)
+    file_id = file_record.id
+    
+    assert index_file_content(file_record)
+    
+    db.session.expire_all()
+    file_record = db.session.get(File, file_id)
+    assert file_record.content_text == 'quarterly report'
+    assert file_record.updated_at == updated_at
+
+def test_backfill_indexes_unindexed_files(app, tmp_path):
+    user = make_user('alice')
+    pending = make_file(tmp_path, user, 'old.txt', b'legacy upload')
+    indexed = make_file(tmp_path, user, 'new.txt', b'fresh upload', content_text='already indexed')
+    unsupported = make_file(tmp_path, user, 'image.png', b'\x89PNG')
+    file_ids = pending.id, indexed.id, unsupported.id
+    
+    result = app.test_cli_runner().invoke(args=['backfill-search', '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Indexed 1 files, 0 failed' in result.output
+    
+    db.session.expire_all()
+    texts = [db.session.get(File, file_id).content_text for file_id in file_ids]
+    assert texts == ['legacy upload', 'already indexed', None]
+
+def search(app, user, **params):
+    token = create_access_token(identity=str(user.id), additional_claims={'is_active': True})
+    response = app.test_client().get('/files/search', query_string=params, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_content_query_matches_the_index_expression():
+    compiled = content_search_vector().compile(dialect=postgresql.dialect())
+    # No bound parameters, otherwise Postgres can't match idx_files_content_tsv
+    assert compiled.params == {}
+    assert str(compiled) == "to_tsvector('simple'::regconfig, coalesce(files.content_text, ''))"
+
+def test_cursor_pages_through_every_file_once(app, tmp_path):
+    user = make_user('alice')
+    base = datetime(2024, 1, 1)
+    # Two files share a timestamp, so the id tie-breaker is exercised
+    offsets = [0, 1, 1, 2, 3]
+    files = [make_file(tmp_path, user, f'file{i}.txt', created_at=base + timedelta(hours=offset)) for i, offset in enumerate(offsets)]
+    expected = [file_record.id for file_record in sorted(files, key=lambda f: (f.created_at, f.id), reverse=True)]
+    
+    seen = []
+    params = {'limit': 2}
+    while True:
+        page = search(app, user, **params)
+        seen.extend(result['id'] for result in page['files'])
+        if page['pagination']['next_cursor'] is None:
+            break
+        params['cursor'] = page['pagination']['next_cursor']
+    
+    assert seen == expected
+
+def test_scope_covers_owned_and_unexpired_shares(app, tmp_path):
+    alice = make_user('alice')
+    bob = make_user('bob')
+    owned = make_file(tmp_path, alice, 'mine.txt')
+    shared = make_file(tmp_path, bob, 'shared.txt')
+    expired = make_file(tmp_path, bob, 'expired.txt')
+    make_file(tmp_path, bob, 'private.txt')
+    
+    now = datetime.utcnow()
+    db.session.add_all([
+        FileShare(file_id=shared.id, shared_with_user_id=alice.id, expires_at=now + timedelta(days=1)),
+        FileShare(file_id=expired.id, shared_with_user_id=alice.id, expires_at=now - timedelta(days=1)),
+    ])
+    db.session.commit()
+    
+    def results(scope):
+        return {result['original_filename']: result['is_owner'] for result in search(app, alice, scope=scope)['files']}
+    
+    assert results('owned') == {'mine.txt': True}
+    assert results('shared') == {'shared.txt': False}
+    assert results('all') == {'mine.txt': True, 'shared.txt': False}
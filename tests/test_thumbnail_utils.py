@@ -0,0 +1,25 @@
+# tests/test_thumbnail_utils.py
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from app.utils import thumbnail_utils
+from app.utils.thumbnail_utils import CACHE_BYTES_KEY, _shared_cache_bytes
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(thumbnail_utils, '_scan_cache', lambda: ([], 1000))
+    return fakeredis.FakeRedis(decode_responses=True)
+
+def test_counter_is_seeded_from_disk_then_incremented(server):
+    assert _shared_cache_bytes(server, 100, 60) == 1000
+    assert 0 < server.ttl(CACHE_BYTES_KEY) <= 60
+    
+    assert _shared_cache_bytes(server, 100, 60) == 1100
+    assert 0 < server.ttl(CACHE_BYTES_KEY) <= 60
+
+def test_counter_without_expiry_is_reseeded(server):
+    # e.g. a counter left behind by INCRBY after the key expired
+    server.set(CACHE_BYTES_KEY, 5)
+    assert _shared_cache_bytes(server, 100, 60) == 1000
+    assert 0 < server.ttl(CACHE_BYTES_KEY) <= 60